@@ -227,7 +227,7 @@ export default function Home() {
                   ConCommerce AI Assistant
                 </h1>
                 <p className="text-xs text-gray-500 dark:text-gray-400 mt-0.5">
-                  10,800+ Products • StarTech & Daraz
+                  9,000+ Products • StarTech & Daraz
                 </p>
               </div>
             </div>
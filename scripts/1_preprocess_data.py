@@ -11,39 +11,84 @@ Key Operations:
 4. Build searchable content for embeddings
 5. Generate unique IDs from SKU
 
-Output: data/processed/products_clean.json
+Output: data/processed/products_clean.jsonl (one JSON product per line)
 """
 
 import pandas as pd
+import numpy as np
 import json
+import orjson
 import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
-def parse_price(price_str):
+# CSV columns the pipeline actually uses
+NEEDED_COLUMNS = [
+    'sku', 'name', 'category', 'brand', 'source', 'price', 'description',
+    'key_features', 'specifications', 'warranty_info', 'url', 'image',
+]
+
+# Fields written for each product, in output order
+OUTPUT_COLUMNS = [
+    'id', 'name', 'price_min', 'price_max', 'category', 'brand', 'source',
+    'url', 'image', 'specs', 'warranty', 'search_content',
+]
+
+# Keys returned by extract_key_specs
+SPEC_KEYS = ['processor', 'ram', 'gpu', 'storage']
+
+# Catalog size from which per-row parsing is spread across CPU cores;
+# below it, process start-up costs more than the parsing itself
+PARALLEL_MIN_ROWS = 50_000
+
+
+class _PriceCharTable(dict):
+    """str.translate table: keep digits, delete commas, map anything else to a space.
+
+    Unicode decimal digits (what regex \\d matches, e.g. Bengali ২৪) map to
+    their ASCII digit; lookups are cached so each character is classified once.
+    """
+
+    def __missing__(self, key):
+        digit = unicodedata.decimal(chr(key), None)
+        self[key] = ' ' if digit is None else str(digit)
+        return self[key]
+
+
+_PRICE_CHARS = _PriceCharTable({ord(c): c for c in '0123456789'})
+_PRICE_CHARS[ord(',')] = None
+
+# Longest digit run that always fits in int64; longer tokens are treated as unparseable
+_MAX_PRICE_DIGITS = 18
+
+# Spec patterns, compiled once instead of on every row
+_RAM_RE = re.compile(r'(\d+GB\s*(?:DDR\d+)?)', re.IGNORECASE)
+_STORAGE_RE = re.compile(r'(\d+(?:GB|TB)\s*(?:NVMe|SSD|HDD)?)', re.IGNORECASE)
+
+
+def parse_prices(price_series):
     """
-    Extract min and max prices from price string.
+    Extract min and max prices from a Series of price strings in one vectorized pass.
 
     Examples:
         "24,499৳28,100৳" → (24499, 28100)
         "93,900৳" → (93900, 93900)
         "50,000" → (50000, 50000)
+        "৳২৪,৪৯৯" → (24499, 24499)
 
     Returns:
-        tuple: (price_min, price_max) or (None, None) if parsing fails
+        tuple: (price_min, price_max) as nullable Int64 Series, <NA> if parsing fails
     """
-    if pd.isna(price_str):
-        return None, None
-
-    # Extract all numbers (remove commas)
-    prices = re.findall(r'[\d,]+', str(price_str))
-    prices = [int(p.replace(',', '')) for p in prices if p.replace(',', '').isdigit()]
+    # Drop commas and blank out every other non-digit, then split into numbers
+    tokens = price_series.astype('string').str.translate(_PRICE_CHARS).str.split().explode().dropna()
+    prices = tokens[tokens.str.len() <= _MAX_PRICE_DIGITS].astype('int64')
 
-    if len(prices) == 0:
-        return None, None
-    elif len(prices) == 1:
-        return prices[0], prices[0]
-    else:
-        return min(prices), max(prices)
+    grouped = prices.groupby(level=0)
+    price_min = grouped.min().reindex(price_series.index).astype('Int64')
+    price_max = grouped.max().reindex(price_series.index).astype('Int64')
+    return price_min, price_max
 
 
 def safe_json_parse(json_str, default=None):
@@ -56,18 +101,35 @@ def safe_json_parse(json_str, default=None):
         return default
 
 
-def extract_key_specs(row):
+def map_rows(func, values):
+    """
+    Apply func to every value, in parallel across CPU cores for large catalogs.
+
+    Args:
+        func: Picklable module-level function (or partial of one)
+        values: List of column values
+
+    Returns:
+        list: func(value) for each value, in order
+    """
+    if len(values) < PARALLEL_MIN_ROWS:
+        return [func(v) for v in values]
+
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(func, values, chunksize=2048))
+
+
+def extract_key_specs(spec_dict):
     """
     Extract processor, RAM, GPU, and storage from specifications JSON.
 
     Args:
-        row: DataFrame row with 'specifications' column
+        spec_dict: Parsed specifications dict (see '_specs_parsed' column)
 
     Returns:
         dict: {'processor': str, 'ram': str, 'gpu': str, 'storage': str}
     """
     specs = {}
-    spec_dict = safe_json_parse(row['specifications'], {})
 
     if not spec_dict:
         return {'processor': None, 'ram': None, 'gpu': None, 'storage': None}
@@ -86,7 +148,7 @@ def extract_key_specs(row):
             ram_text = spec_dict[key]
             if ram_text:
                 # Extract size pattern (e.g., "16GB DDR5" from full text)
-                ram_match = re.search(r'(\d+GB\s*(?:DDR\d+)?)', ram_text, re.IGNORECASE)
+                ram_match = _RAM_RE.search(ram_text)
                 if ram_match:
                     ram_value = ram_match.group(1)
                     break
@@ -110,7 +172,7 @@ def extract_key_specs(row):
             storage_text = spec_dict[key]
             if storage_text:
                 # Extract storage size (e.g., "512GB NVMe SSD")
-                storage_match = re.search(r'(\d+(?:GB|TB)\s*(?:NVMe|SSD|HDD)?)', storage_text, re.IGNORECASE)
+                storage_match = _STORAGE_RE.search(storage_text)
                 if storage_match:
                     storage_value = storage_match.group(1)
                     break
@@ -119,75 +181,76 @@ def extract_key_specs(row):
     return specs
 
 
-def build_searchable_content(row, specs):
+def _labeled(label, values, mask=None):
+    """Prefix each value with its label, or '' where the value is missing."""
+    if mask is None:
+        mask = values.notna()
+    return np.where(mask, label + values.astype(str), '')
+
+
+def build_searchable_content(df):
     """
     Build rich text content for embedding generation.
     Combines all relevant product information into a single searchable text.
 
+    Each labeled line is built as a whole column at once; only the final
+    join of the non-empty lines runs per row.
+
     Args:
-        row: DataFrame row with product data
-        specs: dict with extracted specs
+        df: DataFrame with product data, price columns and 'spec_*' columns
 
     Returns:
-        str: Comprehensive searchable content
+        list[str]: Comprehensive searchable content, one entry per row
     """
-    parts = []
-
-    # Product name (most important)
-    if pd.notna(row.get('name')):
-        parts.append(f"Product: {row['name']}")
-
-    # Category
-    if pd.notna(row.get('category')):
-        parts.append(f"Category: {row['category']}")
+    lines = []
 
-    # Brand
-    if pd.notna(row.get('brand')):
-        parts.append(f"Brand: {row['brand']}")
-
-    # Source (StarTech or Daraz)
-    if pd.notna(row.get('source')):
-        parts.append(f"Source: {row['source']}")
+    # Product name (most important), category, brand, source (StarTech or Daraz)
+    lines.append(_labeled('Product: ', df['name']))
+    lines.append(_labeled('Category: ', df['category']))
+    lines.append(_labeled('Brand: ', df['brand']))
+    lines.append(_labeled('Source: ', df['source']))
 
     # Price
-    price_min = row.get('price_min')
-    price_max = row.get('price_max')
-    if price_min and price_max:
-        if price_min == price_max:
-            parts.append(f"Price: {price_min:,} Taka")
-        else:
-            parts.append(f"Price Range: {price_min:,} to {price_max:,} Taka")
+    price_min = df['price_min']
+    price_max = df['price_max']
+    has_price = (price_min.notna() & price_max.notna()).to_numpy()
+    # Format each distinct price once, then map both columns through the lookup
+    distinct = pd.concat([price_min, price_max]).dropna().unique()
+    formatted = pd.Series([f"{p:,}" for p in distinct.tolist()], index=distinct)
+    min_str = price_min.map(formatted).astype(str)
+    max_str = price_max.map(formatted).astype(str)
+    single_price = (price_min == price_max).fillna(False).to_numpy()
+    lines.append(np.where(
+        has_price,
+        np.where(
+            single_price,
+            'Price: ' + min_str + ' Taka',
+            'Price Range: ' + min_str + ' to ' + max_str + ' Taka',
+        ),
+        '',
+    ))
 
     # Description (first 500 characters to avoid token bloat)
-    if pd.notna(row.get('description')):
-        desc = str(row['description'])[:500]
-        parts.append(f"Description: {desc}")
+    lines.append(_labeled('Description: ', df['description'].astype(str).str.slice(0, 500),
+                          mask=df['description'].notna()))
 
-    # Key Features
-    key_features = safe_json_parse(row.get('key_features'), [])
-    if key_features and isinstance(key_features, list):
-        features_text = ' | '.join(key_features[:5])  # First 5 features
-        parts.append(f"Key Features: {features_text}")
+    # Key Features (first 5 features)
+    lines.append([
+        f"Key Features: {' | '.join(kf[:5])}" if kf and isinstance(kf, list) else ''
+        for kf in df['_features_parsed'].tolist()
+    ])
 
     # Extracted Specs
-    if specs.get('processor'):
-        parts.append(f"Processor: {specs['processor']}")
-
-    if specs.get('ram'):
-        parts.append(f"RAM: {specs['ram']}")
-
-    if specs.get('gpu'):
-        parts.append(f"Graphics: {specs['gpu']}")
+    for key, label in [('processor', 'Processor: '), ('ram', 'RAM: '),
+                       ('gpu', 'Graphics: '), ('storage', 'Storage: ')]:
+        values = df[f'spec_{key}'].fillna('').astype(str)
+        lines.append(_labeled(label, values, mask=values != ''))
 
-    if specs.get('storage'):
-        parts.append(f"Storage: {specs['storage']}")
+    # Warranty (limit warranty text)
+    lines.append(_labeled('Warranty: ', df['warranty_info'].astype(str).str.slice(0, 200),
+                          mask=df['warranty_info'].notna()))
 
-    # Warranty
-    if pd.notna(row.get('warranty_info')):
-        warranty = str(row['warranty_info'])[:200]  # Limit warranty text
-        parts.append(f"Warranty: {warranty}")
-
-    return "\n".join(parts)
+    return ["\n".join(filter(None, parts)) for parts in zip(*lines)]
 
 
 def main():
@@ -198,13 +261,14 @@ def main():
 
     # Paths
     input_path = Path(__file__).parent.parent / 'data' / 'products_merged.csv'
-    output_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    output_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
 
     print(f"\n📂 Reading CSV from: {input_path}")
 
     # Read CSV
     try:
-        df = pd.read_csv(input_path)
+        # Multithreaded Arrow reader, Arrow-backed columns, only the columns we use
+        df = pd.read_csv(input_path, engine='pyarrow', dtype_backend='pyarrow', usecols=NEEDED_COLUMNS)
         print(f"OK Loaded {len(df):,} products")
     except FileNotFoundError:
         print(f"ERROR Error: File not found at {input_path}")
@@ -215,71 +279,81 @@ def main():
 
     print("\n🔄 Processing products...")
 
+    # Parse JSON columns once, reused by spec extraction and content building
+    print("   - Parsing JSON fields...")
+    df['_specs_parsed'] = map_rows(partial(safe_json_parse, default={}), df['specifications'].tolist())
+    df['_features_parsed'] = map_rows(partial(safe_json_parse, default=[]), df['key_features'].tolist())
+
     # Parse prices
     print("   - Parsing prices...")
-    df[['price_min', 'price_max']] = df['price'].apply(
-        lambda x: pd.Series(parse_price(x))
-    )
+    df['price_min'], df['price_max'] = parse_prices(df['price'])
+
+    # Shrink the working set: smallest unsigned ints for prices, categoricals
+    # for the low-cardinality text columns (converted back to str on output)
+    df['price_min'] = pd.to_numeric(df['price_min'], downcast='unsigned')
+    df['price_max'] = pd.to_numeric(df['price_max'], downcast='unsigned')
+    for col in ['category', 'brand', 'source']:
+        df[col] = df[col].astype('category')
 
     # Extract specs
     print("   - Extracting specifications...")
-    df['extracted_specs'] = df.apply(extract_key_specs, axis=1)
+    extracted_specs = map_rows(extract_key_specs, df['_specs_parsed'].tolist())
+
+    # Spread the spec dicts into columns once, so later passes read plain columns
+    specs = pd.DataFrame(extracted_specs, index=df.index, columns=SPEC_KEYS, dtype=object)
+    for key in SPEC_KEYS:
+        df[f'spec_{key}'] = specs[key]
 
     # Build searchable content
     print("   - Building searchable content...")
-    df['search_content'] = df.apply(
-        lambda row: build_searchable_content(row, row['extracted_specs']),
-        axis=1
-    )
+    df['search_content'] = build_searchable_content(df)
 
     # Convert to list of dictionaries
-    print("\n📦 Creating output JSON...")
-    products = []
-    skipped = 0
-
-    for idx, row in df.iterrows():
-        specs = row['extracted_specs']
-
-        # Generate unique ID from SKU or index
-        product_id = f"prod_{row['sku']}" if pd.notna(row.get('sku')) else f"prod_{idx}"
-
-        # Skip products without name or price
-        if pd.isna(row.get('name')) or (row['price_min'] is None):
-            skipped += 1
-            continue
-
-        product = {
-            'id': product_id,
-            'name': str(row['name']),
-            'price_min': int(row['price_min']) if pd.notna(row['price_min']) else None,
-            'price_max': int(row['price_max']) if pd.notna(row['price_max']) else None,
-            'category': str(row['category']) if pd.notna(row.get('category')) else '',
-            'brand': str(row['brand']) if pd.notna(row.get('brand')) else '',
-            'source': str(row['source']) if pd.notna(row.get('source')) else '',
-            'url': str(row['url']) if pd.notna(row.get('url')) else '',
-            'image': str(row['image']) if pd.notna(row.get('image')) else '',
-            'specs': {
-                'processor': specs.get('processor'),
-                'ram': specs.get('ram'),
-                'storage': specs.get('storage'),
-                'graphics': specs.get('gpu'),
-            },
-            'warranty': str(row['warranty_info'])[:200] if pd.notna(row.get('warranty_info')) else '',
-            'search_content': row['search_content'],
-        }
-
-        products.append(product)
+    print("\n📦 Creating output JSON Lines...")
+
+    # Generate unique ID from SKU or, for rows without one, the row index
+    # (separate prefix so a row number can never match a numeric SKU)
+    row_ids = 'prod_row_' + pd.Series(df.index, index=df.index).astype('string')
+    df['id'] = ('prod_' + df['sku'].astype('string')).fillna(row_ids)
+
+    # Skip products without name or price
+    keep = df['name'].notna() & df['price_min'].notna()
+    skipped = int((~keep).sum())
+    df_out = df[keep].copy()
+
+    # Duplicate IDs would silently overwrite each other in Pinecone
+    if not df_out['id'].is_unique:
+        duplicates = df_out.loc[df_out['id'].duplicated(), 'id'].unique().tolist()
+        print(f"ERROR Duplicate product IDs: {duplicates[:10]}")
+        return
+
+    for col in ['name', 'category', 'brand', 'source', 'url', 'image']:
+        df_out[col] = df_out[col].astype('string').fillna('')
+    df_out['warranty'] = df_out['warranty_info'].astype('string').str.slice(0, 200).fillna('')
+    df_out['specs'] = [
+        {'processor': processor, 'ram': ram, 'storage': storage, 'graphics': gpu}
+        for processor, ram, storage, gpu in zip(
+            df_out['spec_processor'].tolist(),
+            df_out['spec_ram'].tolist(),
+            df_out['spec_storage'].tolist(),
+            df_out['spec_gpu'].tolist(),
+        )
+    ]
+
+    products = df_out[OUTPUT_COLUMNS].to_dict(orient='records')
 
     print(f"OK Processed {len(products):,} products")
     if skipped > 0:
         print(f"WARNING  Skipped {skipped} products (missing name or price)")
 
-    # Save to JSON
+    # Save as JSON Lines, serializing one product at a time
     print(f"\n💾 Saving to: {output_path}")
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(products, f, ensure_ascii=False, indent=2)
+    with open(output_path, 'wb') as f:
+        for product in products:
+            f.write(orjson.dumps(product))
+            f.write(b'\n')
 
     # Calculate file size
     file_size_mb = output_path.stat().st_size / (1024 * 1024)
@@ -10,21 +10,124 @@ Model: text-embedding-3-small
 - Quality: Premium semantic understanding
 - Cost: ~$0.02 per 1M tokens (~$0.10 for 10k products)
 
-Input: data/processed/products_clean.json
-Output: data/processed/embeddings_openai.npy (numpy array of shape [N, 384])
+Input: data/processed/products_clean.jsonl
+Output: data/processed/embeddings_openai.npy (float16 numpy array of shape [N, 384], L2-normalized)
 """
 
 import json
+import orjson
+import argparse
+import asyncio
 import numpy as np
 import os
-from openai import OpenAI
-from tqdm import tqdm
+import openai
+from openai import AsyncOpenAI
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from tqdm.asyncio import tqdm_asyncio
 from pathlib import Path
-import time
 from dotenv import load_dotenv
 
-def main():
-    """Main OpenAI embedding generation pipeline."""
+MAX_BATCH_TOKENS = 20_000   # Estimated tokens per request (~100 average products)
+MAX_BATCH_INPUTS = 2048     # OpenAI limit on inputs per embeddings request
+MAX_CONCURRENT_REQUESTS = 10
+MAX_RETRIES = 6
+
+# Errors worth retrying: rate limits and transient network/server failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_exponential_backoff = wait_exponential(multiplier=1, min=1, max=30)
+
+
+def _wait_for_retry(retry_state):
+    """Wait as long as the server's retry-after header asks, else back off exponentially."""
+    error = retry_state.outcome.exception()
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    try:
+        return min(float(retry_after), 60.0)
+    except (TypeError, ValueError):
+        return _exponential_backoff(retry_state)
+
+
+def _log_retry(retry_state):
+    """Print a warning before tenacity sleeps between attempts."""
+    print(f"\n⚠️  Retry {retry_state.attempt_number}/{MAX_RETRIES} due to error: {retry_state.outcome.exception()}")
+
+
+@retry(retry=retry_if_exception_type(RETRYABLE_ERRORS), wait=_wait_for_retry,
+       stop=stop_after_attempt(MAX_RETRIES), before_sleep=_log_retry, reraise=True)
+async def embed_batch(client, batch):
+    """Embed one batch of texts, retrying rate limits and transient errors."""
+    return await client.embeddings.create(
+        model='text-embedding-3-small',
+        input=batch,
+        dimensions=384,  # Native 384 dimensions
+    )
+
+
+def make_batches(lengths):
+    """
+    Group text indices into requests by estimated token budget.
+
+    Texts are sorted by length so each request carries similarly sized
+    inputs, then packed until MAX_BATCH_TOKENS or MAX_BATCH_INPUTS is reached.
+
+    Args:
+        lengths: Character length of each text
+
+    Returns:
+        list[np.ndarray]: Indices into texts, one array per request
+    """
+    order = np.argsort(lengths, kind='stable')
+    estimated_tokens = lengths // 4 + 1  # Rough estimate: 1 token ≈ 4 chars
+
+    batches = []
+    start = 0
+    budget = 0
+    for pos, idx in enumerate(order):
+        tokens = estimated_tokens[idx]
+        if pos > start and (budget + tokens > MAX_BATCH_TOKENS or pos - start >= MAX_BATCH_INPUTS):
+            batches.append(order[start:pos])
+            start = pos
+            budget = 0
+        budget += tokens
+
+    if start < len(order):
+        batches.append(order[start:])
+    return batches
+
+
+async def embed_all(client, texts, batches):
+    """
+    Embed all texts with up to MAX_CONCURRENT_REQUESTS batches in flight.
+
+    Returns:
+        list: One embeddings response per batch, in batch order
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def embed_limited(batch):
+        async with semaphore:
+            return await embed_batch(client, [texts[i] for i in batch])
+
+    return await tqdm_asyncio.gather(
+        *[embed_limited(batch) for batch in batches],
+        desc="Processing batches",
+    )
+
+
+def main(int8=False, archive=False):
+    """
+    Main OpenAI embedding generation pipeline.
+
+    Args:
+        int8: Also save an int8-quantized copy with per-row scales
+        archive: Also save a compressed .npz copy for cold storage
+    """
     # Load environment variables from frontend/.env.local
     env_path = Path(__file__).parent.parent / 'frontend' / '.env.local'
     load_dotenv(env_path)
@@ -45,9 +148,12 @@ def main():
         return
 
     # Paths
-    input_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    input_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
     output_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai.npy'
     metadata_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai_meta.json'
+    int8_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai_int8.npy'
+    int8_scale_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai_int8_scale.npy'
+    archive_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai.npz'
 
     # Check input file exists
     if not input_path.exists():
@@ -58,24 +164,28 @@ def main():
     # Load products
     print(f"\n📂 Loading products from: {input_path}")
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-        print(f"✅ Loaded {len(products):,} products")
+        # Stream line by line, keeping only the search content of each product
+        with open(input_path, 'rb') as f:
+            texts = [orjson.loads(line)['search_content'] for line in f]
+        print(f"✅ Loaded {len(texts):,} products")
     except Exception as e:
         print(f"❌ Error loading products: {e}")
         return
 
-    # Extract search content
-    print("\n📝 Extracting search content...")
-    texts = [p['search_content'] for p in products]
-    print(f"✅ Extracted {len(texts):,} text entries")
+    # Embed each distinct text once; duplicates are scattered back afterwards
+    unique_ids = {}
+    inverse = np.fromiter((unique_ids.setdefault(t, len(unique_ids)) for t in texts),
+                          dtype=np.int64, count=len(texts))
+    unique_texts = list(unique_ids)
+    print(f"   Unique texts: {len(unique_texts):,} ({len(unique_texts) / len(texts):.1%} of products)")
 
-    # Calculate average text length
-    avg_length = sum(len(t) for t in texts) / len(texts)
+    # Text lengths in one pass, reused for stats and cost estimate
+    lengths = np.fromiter(map(len, unique_texts), dtype=np.int64, count=len(unique_texts))
+    avg_length = lengths.mean()
     print(f"   Average text length: {avg_length:.0f} characters")
 
     # Estimate cost
-    total_chars = sum(len(t) for t in texts)
+    total_chars = int(lengths.sum())
     estimated_tokens = total_chars / 4  # Rough estimate: 1 token ≈ 4 chars
     estimated_cost = (estimated_tokens / 1_000_000) * 0.02  # $0.02 per 1M tokens
     print(f"   Estimated tokens: {estimated_tokens:,.0f}")
@@ -84,7 +194,8 @@ def main():
     # Initialize OpenAI client
     print("\n🤖 Initializing OpenAI client...")
     try:
-        client = OpenAI(api_key=api_key)
+        # SDK retries off: embed_batch's tenacity policy is the only retry layer
+        client = AsyncOpenAI(api_key=api_key, max_retries=0)
         print("✅ Client initialized successfully")
     except Exception as e:
         print(f"❌ Error initializing OpenAI client: {e}")
@@ -94,48 +205,21 @@ def main():
     print("\n🔄 Generating embeddings...")
     print(f"   Model: text-embedding-3-small")
     print(f"   Dimensions: 384 (native)")
-    print(f"   Batch size: 100")
-    print(f"   Expected time: 2-5 minutes")
-
-    embeddings_list = []
-    batch_size = 100
-    total_tokens = 0
+    batches = make_batches(lengths)
+    print(f"   Batches: {len(batches)} (length-sorted, ~{MAX_BATCH_TOKENS:,} tokens each)")
+    print(f"   Concurrent requests: {MAX_CONCURRENT_REQUESTS}")
+    print(f"   Expected time: under a minute")
 
     try:
-        for i in tqdm(range(0, len(texts), batch_size), desc="Processing batches"):
-            batch = texts[i:i+batch_size]
-
-            # Call OpenAI API with retry logic
-            max_retries = 3
-            for retry in range(max_retries):
-                try:
-                    response = client.embeddings.create(
-                        model='text-embedding-3-small',
-                        input=batch,
-                        dimensions=384,  # Native 384 dimensions
-                    )
-
-                    # Extract embeddings
-                    batch_embeddings = [item.embedding for item in response.data]
-                    embeddings_list.extend(batch_embeddings)
-
-                    # Track usage
-                    total_tokens += response.usage.total_tokens
-
-                    break  # Success, exit retry loop
-
-                except Exception as e:
-                    if retry < max_retries - 1:
-                        print(f"\n⚠️  Retry {retry + 1}/{max_retries} due to error: {e}")
-                        time.sleep(2 ** retry)  # Exponential backoff
-                    else:
-                        raise  # Re-raise on final retry
-
-            # Small delay to respect rate limits
-            time.sleep(0.1)
-
-        # Convert to numpy array
-        embeddings = np.array(embeddings_list, dtype=np.float32)
+        responses = asyncio.run(embed_all(client, unique_texts, batches))
+
+        # Scatter each batch back to its original rows in a preallocated array
+        unique_embeddings = np.empty((len(unique_texts), 384), dtype=np.float32)
+        for batch, response in zip(batches, responses):
+            unique_embeddings[batch] = [item.embedding for item in response.data]
+        embeddings = unique_embeddings[inverse]
+
+        total_tokens = sum(response.usage.total_tokens for response in responses)
         print(f"\n✅ Generated embeddings: {embeddings.shape}")
         print(f"   Total tokens used: {total_tokens:,}")
         print(f"   Actual cost: ${(total_tokens / 1_000_000) * 0.02:.3f}")
@@ -158,29 +242,53 @@ def main():
     if np.isinf(embeddings).any():
         print("⚠️  Warning: Embeddings contain Inf values!")
 
-    # Save embeddings
+    # L2-normalize so values stay in [-1, 1] for quantization (cosine scores are unchanged)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.maximum(norms, 1e-12)
+
+    # Save embeddings as float16 (half the size of float32, negligible cosine error)
     print(f"\n💾 Saving embeddings to: {output_path}")
     try:
-        np.save(output_path, embeddings)
+        embeddings_fp16 = embeddings.astype(np.float16)
+        np.save(output_path, embeddings_fp16)
         file_size_mb = output_path.stat().st_size / (1024 * 1024)
-        print(f"✅ Saved embeddings ({file_size_mb:.2f} MB)")
+        print(f"✅ Saved float16 embeddings ({file_size_mb:.2f} MB)")
+
+        if int8:
+            # Symmetric per-row quantization: values ≈ int8 / scale
+            scale = 127 / np.maximum(np.abs(embeddings).max(axis=1, keepdims=True), 1e-12)
+            np.save(int8_path, (embeddings * scale).round().astype(np.int8))
+            np.save(int8_scale_path, scale.astype(np.float32))
+            print(f"✅ Saved int8 embeddings to: {int8_path}")
+
+        if archive:
+            np.savez_compressed(archive_path, embeddings=embeddings_fp16)
+            archive_size_mb = archive_path.stat().st_size / (1024 * 1024)
+            print(f"✅ Saved compressed archive to: {archive_path} ({archive_size_mb:.2f} MB)")
     except Exception as e:
         print(f"❌ Error saving embeddings: {e}")
         return
 
     # Save metadata
     metadata = {
-        'num_products': len(products),
+        'num_products': len(texts),
         'embedding_dim': embeddings.shape[1],
         'model': 'openai/text-embedding-3-small',
         'dimensions': 384,
         'shape': list(embeddings.shape),
-        'dtype': str(embeddings.dtype),
+        'dtype': str(embeddings_fp16.dtype),
+        'normalized': True,
         'file_size_mb': file_size_mb,
         'total_tokens': total_tokens,
         'actual_cost_usd': round((total_tokens / 1_000_000) * 0.02, 4),
     }
 
+    if int8:
+        metadata['int8_file'] = int8_path.name
+        metadata['int8_scale_file'] = int8_scale_path.name
+    if archive:
+        metadata['archive_file'] = archive_path.name
+
     print(f"\n💾 Saving metadata to: {metadata_path}")
     with open(metadata_path, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2)
@@ -188,7 +296,7 @@ def main():
 
     # Show sample embeddings
     print("\n📊 Sample embedding (first product, first 10 dimensions):")
-    print(f"   {embeddings[0][:10]}")
+    print(f"   {embeddings_fp16[0][:10]}")
 
     print("\n" + "=" * 60)
     print("✅ OpenAI embedding generation complete!")
@@ -197,7 +305,12 @@ def main():
     print(f"  - {output_path} ({file_size_mb:.2f} MB)")
     print(f"  - {metadata_path}")
     print(f"\nNext step: Run 3_upload_openai_pinecone.py")
+    return True
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Generate OpenAI product embeddings.')
+    parser.add_argument('--int8', action='store_true', help='also save int8-quantized embeddings with per-row scales')
+    parser.add_argument('--archive', action='store_true', help='also save a compressed .npz copy for cold storage')
+    args = parser.parse_args()
+    main(int8=args.int8, archive=args.archive)
@@ -10,26 +10,125 @@ Model: all-MiniLM-L6-v2
 - Quality: 90% of larger models for semantic search
 - Cost: FREE (runs locally)
 
-Input: data/processed/products_clean.json
-Output: data/processed/embeddings.npy (numpy array of shape [N, 384])
+On CPU the model runs through ONNX Runtime with dynamic int8 quantization
+when `optimum[onnxruntime]` is installed (exported once and cached in
+data/models/); if it is missing or the export fails, it falls back to PyTorch
+via sentence-transformers.
+
+Input: data/processed/products_clean.jsonl
+Output: data/processed/embeddings.npy (float16 numpy array of shape [N, 384], L2-normalized)
 """
 
 import json
+import orjson
+import argparse
 import numpy as np
+import platform
+import torch
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 from pathlib import Path
 
-def main():
-    """Main embedding generation pipeline."""
+MODEL_ID = 'sentence-transformers/all-MiniLM-L6-v2'
+ONNX_MODEL_DIR = Path(__file__).parent.parent / 'data' / 'models' / 'all-MiniLM-L6-v2-onnx-int8'
+
+
+def _quantization_config():
+    """Pick the dynamic int8 quantization config matching this CPU."""
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    if platform.machine().lower() in ('arm64', 'aarch64'):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+
+    try:
+        cpu_flags = Path('/proc/cpuinfo').read_text()
+    except OSError:
+        cpu_flags = ''
+    if 'avx512_vnni' in cpu_flags:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+def load_onnx_model():
+    """
+    Load the int8-quantized ONNX export of MiniLM, exporting it on first use.
+
+    Returns:
+        tuple: (ORTModelForFeatureExtraction, tokenizer), or None if
+        optimum[onnxruntime] is not installed or the export/load fails,
+        in which case the caller falls back to PyTorch
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from transformers import AutoTokenizer
+    except ImportError:
+        print("   optimum[onnxruntime] not installed, using PyTorch on CPU")
+        return None
+
+    quantized_file = 'model_quantized.onnx'
+
+    try:
+        if not (ONNX_MODEL_DIR / quantized_file).exists():
+            print("   Exporting model to ONNX and quantizing to int8 (one-time)...")
+            ort_model = ORTModelForFeatureExtraction.from_pretrained(MODEL_ID, export=True)
+            quantizer = ORTQuantizer.from_pretrained(ort_model)
+            quantizer.quantize(save_dir=ONNX_MODEL_DIR, quantization_config=_quantization_config())
+            AutoTokenizer.from_pretrained(MODEL_ID).save_pretrained(ONNX_MODEL_DIR)
+
+        model = ORTModelForFeatureExtraction.from_pretrained(ONNX_MODEL_DIR, file_name=quantized_file)
+        tokenizer = AutoTokenizer.from_pretrained(ONNX_MODEL_DIR)
+    except Exception as e:
+        print(f"   ONNX export/load failed ({e}), using PyTorch on CPU")
+        return None
+
+    return model, tokenizer
+
+
+def encode_onnx(model, tokenizer, texts, batch_size=256):
+    """
+    Encode texts with the ONNX model, matching sentence-transformers output.
+
+    Applies mean pooling over the attention mask followed by L2 normalization,
+    like the all-MiniLM-L6-v2 sentence-transformers pipeline.
+
+    Returns:
+        np.ndarray: float32 array of shape [N, 384]
+    """
+    embeddings = np.empty((len(texts), 384), dtype=np.float32)
+
+    for i in tqdm(range(0, len(texts), batch_size), desc="Processing batches"):
+        batch = texts[i:i+batch_size]
+        inputs = tokenizer(batch, padding=True, truncation=True, max_length=256, return_tensors='np')
+        token_embeddings = model(**inputs).last_hidden_state
+
+        # Mean pooling over real (non-padding) tokens
+        mask = inputs['attention_mask'][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        embeddings[i:i+len(batch)] = pooled / np.maximum(norms, 1e-12)
+
+    return embeddings
+
+
+def main(int8=False, archive=False):
+    """
+    Main embedding generation pipeline.
+
+    Args:
+        int8: Also save an int8-quantized copy with per-row scales
+        archive: Also save a compressed .npz copy for cold storage
+    """
     print("=" * 60)
     print("ConCommerce Embedding Generation")
     print("=" * 60)
 
     # Paths
-    input_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    input_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
     output_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings.npy'
     metadata_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_meta.json'
+    int8_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_int8.npy'
+    int8_scale_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_int8_scale.npy'
+    archive_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings.npz'
 
     # Check input file exists
     if not input_path.exists():
@@ -40,57 +139,68 @@ def main():
     # Load products
     print(f"\n📂 Loading products from: {input_path}")
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-        print(f"OK Loaded {len(products):,} products")
+        # Stream line by line, keeping only the search content of each product
+        with open(input_path, 'rb') as f:
+            texts = [orjson.loads(line)['search_content'] for line in f]
+        print(f"OK Loaded {len(texts):,} products")
     except Exception as e:
         print(f"ERROR Error loading products: {e}")
         return
 
-    # Extract search content
-    print("\n📝 Extracting search content...")
-    texts = [p['search_content'] for p in products]
-    print(f"OK Extracted {len(texts):,} text entries")
-
     # Calculate average text length
     avg_length = sum(len(t) for t in texts) / len(texts)
     print(f"   Average text length: {avg_length:.0f} characters")
 
+    # Embed each distinct text once; duplicates are scattered back afterwards
+    unique_ids = {}
+    inverse = np.fromiter((unique_ids.setdefault(t, len(unique_ids)) for t in texts),
+                          dtype=np.int64, count=len(texts))
+    unique_texts = list(unique_ids)
+    print(f"   Unique texts: {len(unique_texts):,} ({len(unique_texts) / len(texts):.1%} of products)")
+
     # Load model
     print("\n🤖 Loading sentence-transformers model...")
     print("   Model: all-MiniLM-L6-v2")
     print("   (This may take a minute on first run - model will be downloaded)")
 
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    onnx_model = None
+
     try:
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("OK Model loaded successfully")
+        if device == 'cpu':
+            onnx_loaded = load_onnx_model()
+            if onnx_loaded is not None:
+                onnx_model, tokenizer = onnx_loaded
+                print("OK ONNX int8 model loaded successfully (device: cpu)")
+
+        if onnx_model is None:
+            model = SentenceTransformer(MODEL_ID, device=device)
+            if device == 'cuda':
+                model.half()  # fp16 weights use Tensor Cores on GPU
+            print(f"OK Model loaded successfully (device: {device})")
     except Exception as e:
         print(f"ERROR Error loading model: {e}")
         print("\n💡 Tip: Install sentence-transformers with:")
         print("   pip install sentence-transformers")
         return
 
-    # Generate embeddings in batches
+    # Generate embeddings (encode batches internally)
     print("\n🔄 Generating embeddings...")
-    print(f"   Batch size: 100")
+    print(f"   Batch size: 256")
     print(f"   Expected time: 2-5 minutes (depends on CPU)")
 
-    embeddings_list = []
-    batch_size = 100
-
     try:
-        for i in tqdm(range(0, len(texts), batch_size), desc="Processing batches"):
-            batch = texts[i:i+batch_size]
-            batch_embeddings = model.encode(
-                batch,
-                show_progress_bar=False,
+        if onnx_model is not None:
+            unique_embeddings = encode_onnx(onnx_model, tokenizer, unique_texts, batch_size=256)
+        else:
+            unique_embeddings = model.encode(
+                unique_texts,
+                batch_size=256,
+                show_progress_bar=True,
                 convert_to_numpy=True,
-                normalize_embeddings=False  # Pinecone handles normalization
-            )
-            embeddings_list.append(batch_embeddings)
-
-        # Combine all batches
-        embeddings = np.vstack(embeddings_list)
+                normalize_embeddings=True,  # L2-normalize for float16/int8 storage
+            ).astype(np.float32, copy=False)
+        embeddings = unique_embeddings[inverse]
         print(f"\nOK Generated embeddings: {embeddings.shape}")
 
     except Exception as e:
@@ -111,26 +221,47 @@ def main():
     if np.isinf(embeddings).any():
         print("ERROR Warning: Embeddings contain Inf values!")
 
-    # Save embeddings
+    # Save embeddings as float16 (half the size of float32, negligible cosine error)
     print(f"\n💾 Saving embeddings to: {output_path}")
     try:
-        np.save(output_path, embeddings)
+        embeddings_fp16 = embeddings.astype(np.float16)
+        np.save(output_path, embeddings_fp16)
         file_size_mb = output_path.stat().st_size / (1024 * 1024)
-        print(f"OK Saved embeddings ({file_size_mb:.2f} MB)")
+        print(f"OK Saved float16 embeddings ({file_size_mb:.2f} MB)")
+
+        if int8:
+            # Symmetric per-row quantization: values ≈ int8 / scale
+            scale = 127 / np.maximum(np.abs(embeddings).max(axis=1, keepdims=True), 1e-12)
+            np.save(int8_path, (embeddings * scale).round().astype(np.int8))
+            np.save(int8_scale_path, scale.astype(np.float32))
+            print(f"OK Saved int8 embeddings to: {int8_path}")
+
+        if archive:
+            np.savez_compressed(archive_path, embeddings=embeddings_fp16)
+            archive_size_mb = archive_path.stat().st_size / (1024 * 1024)
+            print(f"OK Saved compressed archive to: {archive_path} ({archive_size_mb:.2f} MB)")
     except Exception as e:
         print(f"ERROR Error saving embeddings: {e}")
         return
 
     # Save metadata
     metadata = {
-        'num_products': len(products),
+        'num_products': len(texts),
         'embedding_dim': embeddings.shape[1],
-        'model': 'sentence-transformers/all-MiniLM-L6-v2',
+        'model': MODEL_ID,
+        'backend': 'onnxruntime-int8' if onnx_model is not None else f'pytorch-{device}',
         'shape': list(embeddings.shape),
-        'dtype': str(embeddings.dtype),
+        'dtype': str(embeddings_fp16.dtype),
+        'normalized': True,
         'file_size_mb': file_size_mb,
     }
 
+    if int8:
+        metadata['int8_file'] = int8_path.name
+        metadata['int8_scale_file'] = int8_scale_path.name
+    if archive:
+        metadata['archive_file'] = archive_path.name
+
     print(f"\n💾 Saving metadata to: {metadata_path}")
     with open(metadata_path, 'w', encoding='utf-8') as f:
         json.dump(metadata, f, indent=2)
@@ -138,7 +269,7 @@ def main():
 
     # Show sample embeddings
     print("\n📊 Sample embedding (first product, first 10 dimensions):")
-    print(f"   {embeddings[0][:10]}")
+    print(f"   {embeddings_fp16[0][:10]}")
 
     print("\n" + "=" * 60)
     print("OK Embedding generation complete!")
@@ -147,7 +278,12 @@ def main():
     print(f"  - {output_path} ({file_size_mb:.2f} MB)")
     print(f"  - {metadata_path}")
     print(f"\nNext step: Run 3_upload_pinecone.py")
+    return True
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Generate HuggingFace product embeddings.')
+    parser.add_argument('--int8', action='store_true', help='also save int8-quantized embeddings with per-row scales')
+    parser.add_argument('--archive', action='store_true', help='also save a compressed .npz copy for cold storage')
+    args = parser.parse_args()
+    main(int8=args.int8, archive=args.archive)
@@ -17,19 +17,49 @@ Environment Variables:
 - PINECONE_API_KEY: Your Pinecone API key
 
 Input:
-- data/processed/products_clean.json
-- data/processed/embeddings_openai.npy
+- data/processed/products_clean.jsonl
+- data/processed/embeddings_openai.npy (or a newer embeddings_openai.npk of the
+  same shape when the optional numpack package is installed; see
+  load_embeddings in _pinecone_utils)
 
-Output: ~10,800 OpenAI vectors in Pinecone default namespace
+Output: ~9,000 OpenAI vectors in Pinecone default namespace
 """
 
-import json
+import orjson
 import numpy as np
 import os
-from pinecone import Pinecone, ServerlessSpec
+import time
+from collections import deque
+from pinecone import ServerlessSpec
 from tqdm import tqdm
 from pathlib import Path
 from dotenv import load_dotenv
+from _pinecone_utils import MAX_IN_FLIGHT, chunks, get_client, get_index, load_embeddings, upsert_batch_size
+
+# Metadata length limits (Pinecone has size limits, keep it concise)
+METADATA_MAX_LENS = {'name': 200, 'category': 100, 'brand': 50, 'url': 200, 'image': 200, 'warranty': 150}
+SPEC_MAX_LENS = {'processor': 80, 'ram': 30, 'storage': 30, 'graphics': 80}
+
+
+def build_metadata(product):
+    """Build the Pinecone metadata dict for one product, adding specs if available."""
+    specs = product['specs']
+    metadata = {
+        'price_min': product['price_min'] or 0,
+        'price_max': product['price_max'] or 0,
+        'source': product['source'],
+    }
+
+    for key, max_len in METADATA_MAX_LENS.items():
+        metadata[key] = product[key][:max_len]
+
+    for key, max_len in SPEC_MAX_LENS.items():
+        value = specs.get(key)
+        if value:
+            metadata[key] = value[:max_len]
+
+    return metadata
+
 
 def main():
     """Main Pinecone upload pipeline for OpenAI embeddings."""
@@ -53,7 +83,7 @@ def main():
         return
 
     # Paths
-    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
     embeddings_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings_openai.npy'
 
     # Check input files exist
@@ -70,8 +100,9 @@ def main():
     # Load products
     print(f"\n📂 Loading products from: {products_path}")
     try:
-        with open(products_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
+        # Stream line by line, parsing each JSONL record with orjson
+        with open(products_path, 'rb') as f:
+            products = [orjson.loads(line) for line in f]
         print(f"✅ Loaded {len(products):,} products")
     except Exception as e:
         print(f"❌ Error loading products: {e}")
@@ -80,7 +111,8 @@ def main():
     # Load embeddings
     print(f"\n📂 Loading OpenAI embeddings from: {embeddings_path}")
     try:
-        embeddings = np.load(embeddings_path)
+        # Memory-map: rows are paged in on demand as vectors are prepared
+        embeddings = load_embeddings(embeddings_path)
         print(f"✅ Loaded embeddings: {embeddings.shape}")
     except Exception as e:
         print(f"❌ Error loading embeddings: {e}")
@@ -94,7 +126,7 @@ def main():
     # Initialize Pinecone
     print("\n🔗 Connecting to Pinecone...")
     try:
-        pc = Pinecone(api_key=api_key)
+        pc = get_client()
         print("✅ Connected to Pinecone")
     except Exception as e:
         print(f"❌ Error connecting to Pinecone: {e}")
@@ -124,8 +156,15 @@ def main():
             )
             print(f"✅ Index '{index_name}' created successfully")
             print("   Waiting for index to be ready...")
-            import time
-            time.sleep(10)  # Wait for index to initialize
+            # Poll readiness (up to ~15s) instead of a fixed sleep
+            start_time = time.perf_counter()
+            for _ in range(30):
+                if pc.describe_index(index_name).status['ready']:
+                    print(f"   Index ready after {time.perf_counter() - start_time:.1f}s")
+                    break
+                time.sleep(0.5)
+            else:
+                print("   ⚠️  Index not reported ready yet, continuing anyway")
         except Exception as e:
             print(f"❌ Error creating index: {e}")
             print("\n💡 You can create the index manually at: https://app.pinecone.io/")
@@ -137,7 +176,7 @@ def main():
     # Connect to index
     print(f"\n🔗 Connecting to index: {index_name}")
     try:
-        index = pc.Index(index_name)
+        index = get_index(index_name)
         stats = index.describe_index_stats()
         print(f"✅ Connected to index")
         print(f"   Current vector count: {stats['total_vector_count']:,}")
@@ -148,7 +187,11 @@ def main():
 
         if default_namespace_count > 0:
             print(f"\n⚠️  WARNING: Default namespace already has {default_namespace_count:,} vectors!")
-            print("   This upload will OVERWRITE/UPDATE existing vectors with same IDs.")
+            print("   Only vectors with the same IDs are overwritten. Product IDs changed to")
+            print("   prod_<sku> / prod_row_<n>, so vectors from older runs are NOT replaced")
+            print("   and will show up as duplicates in search. Products without a price are")
+            print("   no longer uploaded, but their old vectors are not deleted either.")
+            print("   💡 For a clean rebuild, cancel and run clear_pinecone.py first.")
             response = input("   Continue? (yes/no): ")
             if response.lower() not in ['yes', 'y']:
                 print("❌ Upload cancelled by user.")
@@ -159,61 +202,47 @@ def main():
 
     # Prepare vectors for upload
     print("\n📦 Preparing vectors for upload to DEFAULT namespace...")
-    vectors_to_upload = []
-
-    for i, product in enumerate(tqdm(products, desc="Processing products")):
-        # Prepare metadata (Pinecone has size limits, keep it concise)
-        metadata = {
-            'name': product['name'][:200],  # Limit length
-            'price_min': product['price_min'] or 0,
-            'price_max': product['price_max'] or 0,
-            'category': product['category'][:100],
-            'brand': product['brand'][:50],
-            'source': product['source'],
-            'url': product['url'][:200],
-            'image': product['image'][:200],
-            'warranty': product['warranty'][:150],
-        }
-
-        # Add specs if available
-        if product['specs'].get('processor'):
-            metadata['processor'] = product['specs']['processor'][:80]
-
-        if product['specs'].get('ram'):
-            metadata['ram'] = product['specs']['ram'][:30]
-
-        if product['specs'].get('storage'):
-            metadata['storage'] = product['specs']['storage'][:30]
-
-        if product['specs'].get('graphics'):
-            metadata['graphics'] = product['specs']['graphics'][:80]
-
-        # Create vector tuple: (id, values, metadata)
-        vector = (
-            product['id'],
-            embeddings[i].tolist(),
-            metadata
-        )
-
-        vectors_to_upload.append(vector)
+    # Page the memory-mapped rows in once as a contiguous float32 block,
+    # then convert to Python floats in one bulk call
+    embedding_lists = np.ascontiguousarray(embeddings, dtype=np.float32).tolist()
+
+    # Vector tuples: (id, values, metadata)
+    vectors_to_upload = [
+        (product['id'], values, build_metadata(product))
+        for product, values in zip(products, embedding_lists)
+    ]
 
     print(f"✅ Prepared {len(vectors_to_upload):,} vectors")
 
     # Upload in batches to DEFAULT namespace (no namespace parameter = default)
+    try:
+        batch_size = upsert_batch_size(vectors_to_upload)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
     print(f"\n⬆️  Uploading to Pinecone DEFAULT namespace...")
-    print(f"   Batch size: 100 vectors")
-    print(f"   Total batches: {(len(vectors_to_upload) + 99) // 100}")
+    print(f"   Batch size: {batch_size} vectors")
+    total_batches = (len(vectors_to_upload) + batch_size - 1) // batch_size
+    print(f"   Total batches: {total_batches}")
     print(f"   Note: Uploading to DEFAULT namespace (for OpenAI embeddings)")
 
-    batch_size = 100
     uploaded_count = 0
 
     try:
-        for i in tqdm(range(0, len(vectors_to_upload), batch_size), desc="Uploading batches"):
-            batch = vectors_to_upload[i:i+batch_size]
-            # Upload to default namespace (no namespace parameter)
-            index.upsert(vectors=batch)
-            uploaded_count += len(batch)
+        # Send batches without waiting (gRPC multiplexes them on one channel),
+        # keeping at most MAX_IN_FLIGHT outstanding so memory stays bounded.
+        # Default namespace = no namespace parameter.
+        in_flight = deque()
+        with tqdm(total=total_batches, desc="Uploading batches") as pbar:
+            for batch in chunks(vectors_to_upload, batch_size):
+                if len(in_flight) >= MAX_IN_FLIGHT:
+                    uploaded_count += in_flight.popleft().result().upserted_count
+                    pbar.update(1)
+                in_flight.append(index.upsert(vectors=batch, async_req=True))
+
+            while in_flight:
+                uploaded_count += in_flight.popleft().result().upserted_count
+                pbar.update(1)
 
         print(f"\n✅ Upload complete! Uploaded {uploaded_count:,} vectors to DEFAULT namespace")
 
@@ -254,6 +283,7 @@ def main():
     print(f"   1. Run 5_upload_huggingface_namespace.py to add HuggingFace embeddings")
     print(f"   2. Test search in frontend at http://localhost:3000")
     print(f"   3. Try both OpenAI and HuggingFace models in the UI")
+    return True
 
 
 if __name__ == '__main__':
@@ -10,19 +10,49 @@ Namespace Strategy:
 
 This allows users to switch between embedding models in the UI while querying
 the correct vector database.
+
+Embeddings are memory-mapped from data/processed/embeddings.npy, unless a newer
+embeddings.npk of the same shape exists and the optional numpack package is
+installed (see load_embeddings in _pinecone_utils).
 """
 
-import json
+import orjson
 import numpy as np
-from pinecone import Pinecone, ServerlessSpec
 from tqdm import tqdm
 from pathlib import Path
 import os
+from collections import deque
 from dotenv import load_dotenv
+from _pinecone_utils import MAX_IN_FLIGHT, chunks, get_client, get_index, load_embeddings, upsert_batch_size
 
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / 'frontend' / '.env.local')
 
+
+def build_metadata(product):
+    """Build the Pinecone metadata dict for one product (same fields as OpenAI namespace)."""
+    get = product.get
+    specs = get('specs') or {}
+    items = (
+        ('name', product['name']),
+        ('price_min', float(get('price_min', 0) or 0)),
+        ('price_max', float(get('price_max', 0) or 0)),
+        ('brand', get('brand', 'Unknown')),
+        ('category', get('category', '')),
+        ('source', get('source', 'Unknown')),
+        ('url', get('url', '')),
+        ('image', get('image', '')),
+        ('processor', specs.get('processor', '')),
+        ('ram', specs.get('ram', '')),
+        ('storage', specs.get('storage', '')),
+        ('graphics', specs.get('graphics', '')),
+        ('warranty', get('warranty', '')),
+    )
+
+    # Skip empty strings and None values to save space
+    return {k: v for k, v in items if v not in ('', None, 0)}
+
+
 def main():
     """Main upload pipeline for HuggingFace embeddings."""
     print("=" * 60)
@@ -30,7 +60,7 @@ def main():
     print("=" * 60)
 
     # Paths
-    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
     embeddings_path = Path(__file__).parent.parent / 'data' / 'processed' / 'embeddings.npy'
 
     # Check files exist
@@ -47,8 +77,9 @@ def main():
     # Load products
     print(f"\n[*] Loading products from: {products_path}")
     try:
-        with open(products_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
+        # Stream line by line, parsing each JSONL record with orjson
+        with open(products_path, 'rb') as f:
+            products = [orjson.loads(line) for line in f]
         print(f"[OK] Loaded {len(products):,} products")
     except Exception as e:
         print(f"[ERROR] Error loading products: {e}")
@@ -57,7 +88,8 @@ def main():
     # Load embeddings
     print(f"\n[*] Loading HuggingFace embeddings from: {embeddings_path}")
     try:
-        embeddings = np.load(embeddings_path)
+        # Memory-map: rows are paged in on demand as vectors are prepared
+        embeddings = load_embeddings(embeddings_path)
         print(f"[OK] Loaded embeddings: {embeddings.shape}")
     except Exception as e:
         print(f"[ERROR] Error loading embeddings: {e}")
@@ -83,7 +115,7 @@ def main():
         return
 
     try:
-        pc = Pinecone(api_key=api_key)
+        pc = get_client()
         print(f"[OK] Connected to Pinecone")
     except Exception as e:
         print(f"[ERROR] Error connecting to Pinecone: {e}")
@@ -104,61 +136,64 @@ def main():
 
     # Get index reference
     try:
-        index = pc.Index(index_name)
+        index = get_index(index_name)
         print(f"[OK] Connected to index: {index_name}")
+
+        namespace_count = index.describe_index_stats().namespaces.get('huggingface')
+        namespace_count = namespace_count.vector_count if namespace_count else 0
+        if namespace_count > 0:
+            print(f"\n[WARNING] 'huggingface' namespace already has {namespace_count:,} vectors!")
+            print("   Only vectors with the same IDs are overwritten. Product IDs changed to")
+            print("   prod_<sku> / prod_row_<n>, so vectors from older runs are NOT replaced")
+            print("   and will show up as duplicates in search. Products without a price are")
+            print("   no longer uploaded, but their old vectors are not deleted either.")
+            print("   For a clean rebuild, cancel and run clear_pinecone.py first.")
+            response = input("   Continue? (yes/no): ")
+            if response.lower() not in ['yes', 'y']:
+                print("[CANCELLED] Upload cancelled by user.")
+                return
     except Exception as e:
         print(f"[ERROR] Error getting index: {e}")
         return
 
     # Prepare vectors for upload
     print("\n[*] Preparing vectors for 'huggingface' namespace...")
-    vectors = []
-    for i, (product, embedding) in enumerate(zip(products, embeddings)):
-        vector_id = product['id']
-
-        # Prepare metadata (same as OpenAI namespace)
-        metadata = {
-            'name': product['name'],
-            'price_min': float(product.get('price_min', 0) or 0),
-            'price_max': float(product.get('price_max', 0) or 0),
-            'brand': product.get('brand', 'Unknown'),
-            'category': product.get('category', ''),
-            'source': product.get('source', 'Unknown'),
-            'url': product.get('url', ''),
-            'image': product.get('image', ''),
-            'processor': product.get('specs', {}).get('processor', ''),
-            'ram': product.get('specs', {}).get('ram', ''),
-            'storage': product.get('specs', {}).get('storage', ''),
-            'graphics': product.get('specs', {}).get('graphics', ''),
-            'warranty': product.get('warranty', ''),
-        }
-
-        # Remove empty strings and None values to save space
-        metadata = {k: v for k, v in metadata.items() if v not in ('', None, 0)}
-
-        vectors.append({
-            'id': vector_id,
-            'values': embedding.tolist(),
-            'metadata': metadata
-        })
+    # Page the memory-mapped rows in once as a contiguous float32 block,
+    # then convert to Python floats in one bulk call
+    embedding_lists = np.ascontiguousarray(embeddings, dtype=np.float32).tolist()
+
+    vectors = [
+        {'id': product['id'], 'values': values, 'metadata': build_metadata(product)}
+        for product, values in zip(products, embedding_lists)
+    ]
 
     print(f"[OK] Prepared {len(vectors):,} vectors")
 
     # Upload in batches to huggingface namespace
+    try:
+        batch_size = upsert_batch_size(vectors)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return
     print("\n[*] Uploading to 'huggingface' namespace...")
-    batch_size = 100
+    print(f"   Batch size: {batch_size} vectors")
+    total_batches = (len(vectors) + batch_size - 1) // batch_size
     successful_uploads = 0
 
     try:
-        for i in tqdm(range(0, len(vectors), batch_size), desc="Uploading batches"):
-            batch = vectors[i:i+batch_size]
-
-            # Upload to 'huggingface' namespace
-            index.upsert(
-                vectors=batch,
-                namespace='huggingface'
-            )
-            successful_uploads += len(batch)
+        # Send batches to 'huggingface' namespace without waiting (gRPC
+        # multiplexes them on one channel), keeping at most MAX_IN_FLIGHT outstanding
+        in_flight = deque()
+        with tqdm(total=total_batches, desc="Uploading batches") as pbar:
+            for batch in chunks(vectors, batch_size):
+                if len(in_flight) >= MAX_IN_FLIGHT:
+                    successful_uploads += in_flight.popleft().result().upserted_count
+                    pbar.update(1)
+                in_flight.append(index.upsert(vectors=batch, namespace='huggingface', async_req=True))
+
+            while in_flight:
+                successful_uploads += in_flight.popleft().result().upserted_count
+                pbar.update(1)
 
         print(f"\n[OK] Successfully uploaded {successful_uploads:,} vectors to 'huggingface' namespace!")
 
@@ -189,5 +224,7 @@ def main():
     except Exception as e:
         print(f"[ERROR] Error getting stats: {e}")
 
+    return True
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,138 @@
+"""
+Shared Pinecone Helpers - ConCommerce RAG Pipeline
+===================================================
+Cached client and index handles plus the embedding loading and upsert
+batching helpers shared by the upload scripts and setup.py.
+
+When setup.py runs the upload steps in one process, both steps get the same
+gRPC client and index connection instead of opening their own.
+
+The gRPC client sends upserts as protobuf, so vector values and metadata are
+never JSON-encoded on the upload path.
+
+Environment Variables:
+- PINECONE_API_KEY: Your Pinecone API key
+- PINECONE_BATCH_SIZE: Vectors per upsert request (default: 250)
+"""
+
+import functools
+import numpy as np
+import orjson
+from itertools import islice
+import os
+from pinecone.grpc import PineconeGRPC as Pinecone
+
+# Vectors per upsert request (Pinecone recommends 100-500); override with PINECONE_BATCH_SIZE
+DEFAULT_BATCH_SIZE = 250
+MAX_REQUEST_BYTES = 1_800_000  # headroom under Pinecone's 2MB per-request limit
+MAX_IN_FLIGHT = 16  # upsert requests awaiting a response at once
+
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    """Return the process-wide Pinecone gRPC client."""
+    return Pinecone(api_key=os.environ['PINECONE_API_KEY'])
+
+
+@functools.lru_cache(maxsize=None)
+def get_index(name):
+    """Return a cached connection to the named index."""
+    return get_client().Index(name)
+
+
+def _estimated_vector_bytes(vector):
+    """
+    Estimate the protobuf size of one upsert vector.
+
+    Values travel as packed float32 (4 bytes each); metadata is a protobuf
+    Struct, approximated by its JSON size, plus a small per-vector overhead.
+
+    Args:
+        vector: (id, values, metadata) tuple or {'id', 'values', 'metadata'} dict
+
+    Returns:
+        int: Estimated size in bytes
+    """
+    if isinstance(vector, dict):
+        vector_id, values, metadata = vector['id'], vector['values'], vector.get('metadata', {})
+    else:
+        vector_id, values, metadata = vector
+    return len(values) * 4 + len(vector_id) + len(orjson.dumps(metadata)) + 32
+
+
+def upsert_batch_size(vectors):
+    """
+    Pick the upsert batch size: PINECONE_BATCH_SIZE (read at call time),
+    shrunk if the largest sampled vector (estimated protobuf size) would
+    overflow a request.
+
+    Args:
+        vectors: List of upsert vectors (tuples or dicts)
+
+    Returns:
+        int: Number of vectors per upsert request
+
+    Raises:
+        ValueError: If PINECONE_BATCH_SIZE is not a positive integer
+    """
+    raw = os.getenv('PINECONE_BATCH_SIZE', str(DEFAULT_BATCH_SIZE))
+    try:
+        batch_size = int(raw)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        raise ValueError(f"PINECONE_BATCH_SIZE must be a positive integer, got {raw!r}")
+
+    sample_bytes = max((_estimated_vector_bytes(vector) for vector in vectors[:100]), default=1)
+    return max(1, min(batch_size, MAX_REQUEST_BYTES // sample_bytes))
+
+
+def chunks(seq, size):
+    """
+    Split a sequence into consecutive batches without index slicing.
+
+    Args:
+        seq: Sequence or iterable of items to batch
+        size: Maximum number of items per batch
+
+    Returns:
+        iterator: Lists of up to size items, in order
+    """
+    it = iter(seq)
+    return iter(lambda: list(islice(it, size)), [])
+
+
+def load_embeddings(path):
+    """
+    Load the embedding matrix for upload.
+
+    A NumPack copy (<name>.npk next to the .npy file) is used only when the
+    optional numpack package is installed, the copy is newer than the .npy
+    file, and it has the same shape; otherwise the .npy file is memory-mapped.
+
+    Args:
+        path: Path to the .npy embeddings file
+
+    Returns:
+        np.ndarray: Embedding matrix of shape [N, dim]
+    """
+    embeddings = np.load(path, mmap_mode='r')
+
+    npk_path = path.with_suffix('.npk')
+    if npk_path.exists():
+        if npk_path.stat().st_mtime <= path.stat().st_mtime:
+            print(f"   Ignoring {npk_path.name}: older than {path.name}")
+        else:
+            try:
+                from numpack import NumPack
+            except ImportError:
+                print(f"   Ignoring {npk_path.name}: numpack is not installed")
+            else:
+                npk_embeddings = np.asarray(NumPack(npk_path).load('embeddings'))
+                if npk_embeddings.shape == embeddings.shape:
+                    print(f"   Loaded embeddings from {npk_path.name}")
+                    return npk_embeddings
+                print(f"   Ignoring {npk_path.name}: shape {npk_embeddings.shape} != {embeddings.shape}")
+
+    print(f"   Loaded embeddings from {path.name}")
+    return embeddings
@@ -11,9 +11,11 @@ Environment Variables:
 """
 
 import os
-from pinecone import Pinecone
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
+from _pinecone_utils import get_client, get_index
 
 def main():
     """Clear all vectors from Pinecone index."""
@@ -39,7 +41,7 @@ def main():
     # Initialize Pinecone
     print("\n🔗 Connecting to Pinecone...")
     try:
-        pc = Pinecone(api_key=api_key)
+        pc = get_client()
         print("✅ Connected to Pinecone")
     except Exception as e:
         print(f"❌ Error connecting to Pinecone: {e}")
@@ -59,7 +61,7 @@ def main():
     # Connect to index
     print(f"\n🔗 Connecting to index: {index_name}")
     try:
-        index = pc.Index(index_name)
+        index = get_index(index_name)
         stats = index.describe_index_stats()
         total_count = stats['total_vector_count']
         namespaces = stats.get('namespaces', {})
@@ -94,15 +96,16 @@ def main():
     # Delete all vectors from all namespaces
     print("\n🗑️  Deleting vectors...")
 
+    def delete_namespace(ns_name):
+        ns_display = 'DEFAULT' if ns_name == '' else ns_name
+        print(f"   Deleting from {ns_display} namespace...")
+        index.delete(delete_all=True, namespace=ns_name)
+
     try:
-        # Delete from each namespace
+        # Delete all namespaces concurrently (index.delete is thread-safe)
         if namespaces:
-            for ns_name in namespaces.keys():
-                ns_display = 'DEFAULT' if ns_name == '' else ns_name
-                print(f"   Deleting from {ns_display} namespace...")
-
-                # Delete all vectors in this namespace
-                index.delete(delete_all=True, namespace=ns_name)
+            with ThreadPoolExecutor(max_workers=len(namespaces)) as executor:
+                list(executor.map(delete_namespace, namespaces.keys()))
 
         print(f"\n✅ All vectors deleted successfully!")
 
@@ -113,11 +116,13 @@ def main():
     # Verify deletion
     print("\n🔍 Verifying deletion...")
     try:
-        import time
-        time.sleep(2)  # Wait for deletion to propagate
-
-        stats = index.describe_index_stats()
-        total_count = stats['total_vector_count']
+        # Poll until deletion has propagated (up to ~5s) instead of a fixed sleep
+        for _ in range(10):
+            stats = index.describe_index_stats()
+            total_count = stats['total_vector_count']
+            if total_count == 0:
+                break
+            time.sleep(0.5)
 
         print(f"✅ Verification complete!")
         print(f"   Total vectors remaining: {total_count:,}")
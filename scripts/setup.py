@@ -14,24 +14,36 @@ What this script does:
 Requirements:
 - OPENAI_API_KEY environment variable
 - PINECONE_API_KEY environment variable
-- products_clean.json exists (run 1_preprocess_csv.py first)
+- products_clean.jsonl exists (run 1_preprocess_csv.py first)
 
 Estimated time: 5-10 minutes
 Estimated cost: ~$0.10 for OpenAI embeddings
 """
 
-import subprocess
-import sys
+import importlib.util
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from _pinecone_utils import get_client, get_index
 
 # Load environment variables from frontend/.env.local
 env_path = Path(__file__).parent.parent / 'frontend' / '.env.local'
 load_dotenv(env_path)
 
+def load_step(script_path):
+    """Import a numbered pipeline script as a module (names like 2_... aren't importable)."""
+    spec = importlib.util.spec_from_file_location(script_path.stem, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
 def run_script(script_name, description):
-    """Run a Python script and handle errors."""
+    """Run a pipeline script's main() in this process and handle errors.
+
+    Running in-process shares imports (numpy, torch, pinecone) and the
+    cached Pinecone client from _pinecone_utils across steps instead of
+    cold-starting an interpreter per step.
+    """
     print("\n" + "=" * 60)
     print(f"📍 STEP: {description}")
     print("=" * 60)
@@ -43,22 +55,20 @@ def run_script(script_name, description):
         return False
 
     try:
-        # Run the script as a subprocess
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            check=True,
-            capture_output=False,  # Show output in real-time
-            text=True
-        )
-
-        print(f"\n✅ {description} completed successfully!")
-        return True
-
-    except subprocess.CalledProcessError as e:
+        # Each script's main() returns True on success and None on an early exit
+        succeeded = load_step(script_path).main()
+    except Exception as e:
         print(f"\n❌ {description} failed with error!")
-        print(f"   Error code: {e.returncode}")
+        print(f"   Error: {e}")
         return False
 
+    if not succeeded:
+        print(f"\n❌ {description} did not complete!")
+        return False
+
+    print(f"\n✅ {description} completed successfully!")
+    return True
+
 def check_prerequisites():
     """Check if all prerequisites are met."""
     print("=" * 60)
@@ -84,12 +94,12 @@ def check_prerequisites():
 
     # Check input file
     print("\n📁 Input Files:")
-    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.json'
+    products_path = Path(__file__).parent.parent / 'data' / 'processed' / 'products_clean.jsonl'
 
     if products_path.exists():
-        print(f"   ✅ products_clean.json exists")
+        print(f"   ✅ products_clean.jsonl exists")
     else:
-        print(f"   ❌ products_clean.json NOT found")
+        print(f"   ❌ products_clean.jsonl NOT found")
         print(f"      Please run 1_preprocess_csv.py first")
         all_good = False
 
@@ -107,6 +117,38 @@ def check_prerequisites():
     print("\n✅ All prerequisites met!")
     return True
 
+def check_existing_vectors():
+    """
+    Warn if the Pinecone index already holds vectors from an earlier run.
+
+    Uploads only overwrite vectors with the same IDs, so vectors whose IDs no
+    longer exist (changed ID scheme, dropped products) would stay next to the
+    new ones and show up as duplicates in search.
+
+    Returns:
+        bool: True to continue with the setup, False to stop
+    """
+    index_name = os.getenv('PINECONE_INDEX_NAME', 'concommerce-products')
+    try:
+        if index_name not in get_client().list_indexes().names():
+            return True
+        total_count = get_index(index_name).describe_index_stats()['total_vector_count']
+    except Exception as e:
+        print(f"\n⚠️  Could not check existing vectors: {e}")
+        return True
+
+    if total_count == 0:
+        return True
+
+    print(f"\n⚠️  Index '{index_name}' already has {total_count:,} vectors from an earlier run!")
+    print("   Uploads only overwrite vectors with the same IDs. Product IDs changed to")
+    print("   prod_<sku> / prod_row_<n>, so old vectors will remain as duplicates,")
+    print("   and vectors of products dropped for having no price are never deleted.")
+    print("\n💡 For a clean rebuild, stop here and run first:")
+    print("   python clear_pinecone.py")
+    response = input("\nContinue without clearing? (yes/no): ")
+    return response.lower() in ['yes', 'y']
+
 def main():
     """Main setup pipeline."""
     print("=" * 60)
@@ -128,6 +170,10 @@ def main():
     if not check_prerequisites():
         return
 
+    if not check_existing_vectors():
+        print("❌ Setup cancelled. Run clear_pinecone.py, then setup.py again.")
+        return
+
     # Step 1: Generate OpenAI embeddings
     if not run_script('2_generate_openai_embeddings.py', 'Generate OpenAI Embeddings'):
         print("\n❌ Setup failed at step 1. Please check the errors above.")
@@ -154,9 +200,9 @@ def main():
     print("=" * 60)
     print("\n✅ Both embedding models are now ready!")
     print("\n📊 Your Pinecone index now has:")
-    print("   - DEFAULT namespace: OpenAI embeddings (~10,800 vectors)")
-    print("   - 'huggingface' namespace: HuggingFace embeddings (~10,800 vectors)")
-    print("   - Total: ~21,600 vectors")
+    print("   - DEFAULT namespace: OpenAI embeddings (~9,000 vectors)")
+    print("   - 'huggingface' namespace: HuggingFace embeddings (~9,000 vectors)")
+    print("   - Total: ~18,000 vectors")
     print("\n💡 Next steps:")
     print("   1. Start the frontend: cd frontend && npm run dev")
     print("   2. Open http://localhost:3000")